@@ -1,8 +1,15 @@
 import os
+import click
 from flask import Flask
 from dotenv import load_dotenv
+
+# Load .env before importing modules that read configuration at import time
+load_dotenv()
+
 from extensions import db, login_manager, cache
 from models import User
+from sqlalchemy.orm import make_transient_to_detached
+from utils import user_cache_key, USER_CACHE_TIMEOUT
 from routes.auth import auth_bp
 from routes.seeker import seeker_bp
 from routes.employer import employer_bp
@@ -10,6 +17,94 @@ from routes.main import main_bp
 from routes.chat import chat_bp
 
 
+def init_db(app, raise_errors=False):
+    """Create missing tables, columns and indexes. Run once per deploy rather than at import.
+    Dev entry points log failures and carry on; the deploy command passes raise_errors=True."""
+    with app.app_context():
+        try:
+            db.create_all()
+
+            # Run automatic schema migrations for location and logo column updates
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+
+            # Alter 'users' table if columns are missing
+            user_columns = [c['name'] for c in inspector.get_columns('users')]
+            with db.engine.begin() as conn:
+                if 'state' not in user_columns:
+                    conn.execute(db.text("ALTER TABLE users ADD COLUMN state VARCHAR(100)"))
+                if 'country' not in user_columns:
+                    conn.execute(db.text("ALTER TABLE users ADD COLUMN country VARCHAR(100)"))
+                if 'company_logo' not in user_columns:
+                    conn.execute(db.text("ALTER TABLE users ADD COLUMN company_logo VARCHAR(255)"))
+                if 'logo_updated_at' not in user_columns:
+                    conn.execute(db.text("ALTER TABLE users ADD COLUMN logo_updated_at TIMESTAMP"))
+                if 'address_updated_at' not in user_columns:
+                    conn.execute(db.text("ALTER TABLE users ADD COLUMN address_updated_at TIMESTAMP"))
+                if 'skills' not in user_columns:
+                    conn.execute(db.text("ALTER TABLE users ADD COLUMN skills TEXT"))
+
+            # Alter 'job_postings' table if columns are missing
+            job_columns = [c['name'] for c in inspector.get_columns('job_postings')]
+            with db.engine.begin() as conn:
+                if 'state' not in job_columns:
+                    conn.execute(db.text("ALTER TABLE job_postings ADD COLUMN state VARCHAR(100)"))
+                if 'country' not in job_columns:
+                    conn.execute(db.text("ALTER TABLE job_postings ADD COLUMN country VARCHAR(100)"))
+                if 'skills_required' not in job_columns:
+                    conn.execute(db.text("ALTER TABLE job_postings ADD COLUMN skills_required TEXT"))
+
+            # create_all() skips existing tables, so add any declared indexes they are missing
+            for table in db.metadata.sorted_tables:
+                existing_indexes = {ix['name'] for ix in inspector.get_indexes(table.name)}
+                for index in table.indexes:
+                    if index.name in existing_indexes:
+                        continue
+                    try:
+                        with db.engine.begin() as conn:
+                            if index.unique:
+                                # Tables that predate the unique rule may hold duplicates; keep the oldest row of each
+                                cols = ', '.join(c.name for c in index.columns)
+                                conn.execute(db.text(
+                                    f"DELETE FROM {table.name} WHERE id NOT IN "
+                                    f"(SELECT MIN(id) FROM {table.name} GROUP BY {cols})"))
+                            index.create(conn)
+                    except Exception as e:
+                        if raise_errors:
+                            raise
+                        print(f"Could not create index {index.name}: {e}")
+
+            # Safe PostgreSQL migration for zip_code column conversion from VARCHAR to INTEGER (Requirement 3: integer zip code)
+            if db.engine.dialect.name == 'postgresql':
+                users_cols_raw = inspector.get_columns('users')
+                zip_col = next((c for c in users_cols_raw if c['name'] == 'zip_code'), None)
+                if zip_col and 'varchar' in str(zip_col['type']).lower():
+                    with db.engine.begin() as conn:
+                        conn.execute(db.text("ALTER TABLE users ALTER COLUMN zip_code TYPE INTEGER USING (CASE WHEN zip_code ~ '^[0-9]+$' THEN zip_code::integer ELSE NULL END)"))
+
+                jobs_cols_raw = inspector.get_columns('job_postings')
+                job_zip_col = next((c for c in jobs_cols_raw if c['name'] == 'zip_code'), None)
+                if job_zip_col and 'varchar' in str(job_zip_col['type']).lower():
+                    with db.engine.begin() as conn:
+                        conn.execute(db.text("ALTER TABLE job_postings ALTER COLUMN zip_code TYPE INTEGER USING (CASE WHEN zip_code ~ '^[0-9]+$' THEN zip_code::integer ELSE 0 END)"))
+
+            print("Database tables and schema migrations initialized successfully!")
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Database initialization error: {e}")
+
+
+def _asset_version(*folders):
+    """Latest modification time of any file under the given folders, as a string"""
+    latest = 0
+    for folder in folders:
+        for root, _, files in os.walk(folder):
+            for name in files:
+                latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+    return str(int(latest))
+
+
 def create_app():
     load_dotenv()
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -22,6 +117,11 @@ def create_app():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['UPLOAD_FOLDER'] = os.path.join(frontend_static, 'uploads', 'resumes')
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+    # Let a fronting nginx/Apache stream file downloads itself instead of tying up a worker
+    app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+    # Identifies the deployed templates/assets so conditional page responses change with each release
+    app.config['BUILD_VERSION'] = os.getenv('BUILD_VERSION') or _asset_version(
+        frontend_templates, os.path.join(frontend_static, 'css'), os.path.join(frontend_static, 'js'))
     
     database_url = os.getenv('DATABASE_URL')
     if database_url and ('host:port/database' in database_url or database_url == ''):
@@ -55,8 +155,14 @@ def create_app():
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     
-    # Configure and initialize caching (SimpleCache is extremely fast and robust for web workloads)
-    app.config['CACHE_TYPE'] = 'SimpleCache'
+    # Configure and initialize caching. Redis shares cached entries across workers when REDIS_URL is set;
+    # otherwise fall back to the per-process SimpleCache
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url:
+        app.config['CACHE_TYPE'] = 'RedisCache'
+        app.config['CACHE_REDIS_URL'] = redis_url
+    else:
+        app.config['CACHE_TYPE'] = 'SimpleCache'
     app.config['CACHE_DEFAULT_TIMEOUT'] = 300
     cache.init_app(app)
     
@@ -70,10 +176,31 @@ def create_app():
         session.permanent = True
         session.modified = True
     
-    # User loader callback for Flask-Login
+    # User loader callback for Flask-Login. With a shared Redis cache the row's columns (minus the
+    # password hash) are cached briefly so most requests skip the SELECT. The per-process SimpleCache
+    # is not used here: an invalidation in one worker would leave stale users in the others
+    cache_users = app.config['CACHE_TYPE'] == 'RedisCache'
+    
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        cache_key = user_cache_key(user_id)
+        if cache_users:
+            data = cache.get(cache_key)
+            if data is not None:
+                # Re-attach as a persistent instance without querying; the password hash stays unloaded
+                # and is fetched lazily on the rare paths that verify it
+                user = User(**data)
+                make_transient_to_detached(user)
+                return db.session.merge(user, load=False)
+        user = db.session.get(User, int(user_id))
+        if user:
+            if cache_users:
+                data = {c.key: getattr(user, c.key) for c in User.__table__.columns if c.key != 'password_hash'}
+                cache.set(cache_key, data, timeout=USER_CACHE_TIMEOUT)
+        else:
+            # The account is gone; drop its role so auth pages stop redirecting to a dashboard
+            session.pop('role', None)
+        return user
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(seeker_bp)
@@ -81,65 +208,24 @@ def create_app():
     app.register_blueprint(main_bp)
     app.register_blueprint(chat_bp)
 
-    
-    with app.app_context():
+
+    # Schema setup runs once per deploy via `flask --app app init-db`, not on every worker import
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create tables and apply pending schema migrations."""
+        # Exit non-zero so a failed migration stops the deploy
         try:
-            db.create_all()
-            
-            # Run automatic schema migrations for location and logo column updates
-            from sqlalchemy import inspect
-            inspector = inspect(db.engine)
-            
-            # Alter 'users' table if columns are missing
-            user_columns = [c['name'] for c in inspector.get_columns('users')]
-            with db.engine.begin() as conn:
-                if 'state' not in user_columns:
-                    conn.execute(db.text("ALTER TABLE users ADD COLUMN state VARCHAR(100)"))
-                if 'country' not in user_columns:
-                    conn.execute(db.text("ALTER TABLE users ADD COLUMN country VARCHAR(100)"))
-                if 'company_logo' not in user_columns:
-                    conn.execute(db.text("ALTER TABLE users ADD COLUMN company_logo VARCHAR(255)"))
-                if 'logo_updated_at' not in user_columns:
-                    conn.execute(db.text("ALTER TABLE users ADD COLUMN logo_updated_at TIMESTAMP"))
-                if 'address_updated_at' not in user_columns:
-                    conn.execute(db.text("ALTER TABLE users ADD COLUMN address_updated_at TIMESTAMP"))
-                if 'skills' not in user_columns:
-                    conn.execute(db.text("ALTER TABLE users ADD COLUMN skills TEXT"))
-            
-            # Alter 'job_postings' table if columns are missing
-            job_columns = [c['name'] for c in inspector.get_columns('job_postings')]
-            with db.engine.begin() as conn:
-                if 'state' not in job_columns:
-                    conn.execute(db.text("ALTER TABLE job_postings ADD COLUMN state VARCHAR(100)"))
-                if 'country' not in job_columns:
-                    conn.execute(db.text("ALTER TABLE job_postings ADD COLUMN country VARCHAR(100)"))
-                if 'skills_required' not in job_columns:
-                    conn.execute(db.text("ALTER TABLE job_postings ADD COLUMN skills_required TEXT"))
-                    
-            # Safe PostgreSQL migration for zip_code column conversion from VARCHAR to INTEGER (Requirement 3: integer zip code)
-            if db.engine.dialect.name == 'postgresql':
-                users_cols_raw = inspector.get_columns('users')
-                zip_col = next((c for c in users_cols_raw if c['name'] == 'zip_code'), None)
-                if zip_col and 'varchar' in str(zip_col['type']).lower():
-                    with db.engine.begin() as conn:
-                        conn.execute(db.text("ALTER TABLE users ALTER COLUMN zip_code TYPE INTEGER USING (CASE WHEN zip_code ~ '^[0-9]+$' THEN zip_code::integer ELSE NULL END)"))
-                
-                jobs_cols_raw = inspector.get_columns('job_postings')
-                job_zip_col = next((c for c in jobs_cols_raw if c['name'] == 'zip_code'), None)
-                if job_zip_col and 'varchar' in str(job_zip_col['type']).lower():
-                    with db.engine.begin() as conn:
-                        conn.execute(db.text("ALTER TABLE job_postings ALTER COLUMN zip_code TYPE INTEGER USING (CASE WHEN zip_code ~ '^[0-9]+$' THEN zip_code::integer ELSE 0 END)"))
-                    
-            print("Database tables and schema migrations initialized successfully!")
+            init_db(app, raise_errors=True)
         except Exception as e:
-            print(f"Database initialization error: {e}")
-            
+            raise click.ClickException(f"Database initialization error: {e}")
+
     return app
 
 if __name__ == '__main__':
     # When run directly, we might not have the parent package recognized,
     # so we import absolutely if running directly, or just let python handle it.
     app = create_app()
+    init_db(app)
     app.run(debug=True)
 else:
     app = create_app()
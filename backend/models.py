@@ -1,9 +1,13 @@
 from datetime import datetime
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 from extensions import db
 from extensions import login_manager
 
+password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
     
@@ -45,10 +49,24 @@ class User(UserMixin, db.Model):
     saved_jobs = db.relationship('SavedJob', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify the password, upgrading legacy or outdated hashes in place.
+        Callers that commit afterwards (e.g. login) persist the new hash."""
+        if not self.password_hash.startswith('$argon2'):
+            # Accounts created before the argon2 switch still carry legacy Werkzeug (scrypt/pbkdf2) hashes
+            if not check_password_hash(self.password_hash, password):
+                return False
+            self.set_password(password)
+            return True
+        try:
+            password_hasher.verify(self.password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+        if password_hasher.check_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
     
     def __repr__(self):
         return f'<User {self.email}>'
@@ -56,6 +74,12 @@ class User(UserMixin, db.Model):
 
 class JobPosting(db.Model):
     __tablename__ = 'job_postings'
+    __table_args__ = (
+        db.Index('ix_jobs_employer_created', 'employer_id', 'created_at'),
+        db.Index('ix_jobs_status_category', 'status', 'category'),
+        db.Index('ix_jobs_lat_lng', 'latitude', 'longitude'),
+        db.Index('ix_job_employer_status', 'employer_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     employer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -95,6 +119,10 @@ class JobPosting(db.Model):
 
 class Application(db.Model):
     __tablename__ = 'applications'
+    __table_args__ = (
+        db.Index('ix_app_job_applicant', 'job_id', 'applicant_id', unique=True),
+        db.Index('ix_app_job_status_submitted', 'job_id', 'status', 'submitted_at', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     job_id = db.Column(db.Integer, db.ForeignKey('job_postings.id'), nullable=False)
@@ -128,6 +156,9 @@ class Resume(db.Model):
 
 class SavedJob(db.Model):
     __tablename__ = 'saved_jobs'
+    __table_args__ = (
+        db.Index('ix_saved_jobs_user_job', 'user_id', 'job_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
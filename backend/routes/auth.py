@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, session
 from flask_login import current_user, login_user, logout_user, login_required
 from datetime import datetime
 import os
@@ -7,17 +7,29 @@ import uuid
 import time
 from models import User
 from extensions import db
-from utils import geocode_address, clean_street_address
+from utils import geocode_address, clean_street_address, invalidate_cached_user, dashboard_redirect
 
 auth_bp = Blueprint('auth', __name__)
 
+
+def _logged_in_role():
+    """Role of the logged-in user, read from the signed session cookie set at login so
+    already-authenticated visitors can be redirected without loading their user row"""
+    if not session.get('_user_id'):
+        return None
+    role = session.get('role')
+    if role is None and current_user.is_authenticated:
+        # Sessions created before the role was stored fall back to the user row once
+        role = session['role'] = current_user.role
+    return role
+
+
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
-    if current_user.is_authenticated:
+    role = _logged_in_role()
+    if role:
         flash('You are already logged in. Logout first to create a new account.', 'warning')
-        if current_user.role == 'employer':
-            return redirect(url_for('employer.employer_dashboard'))
-        return redirect(url_for('seeker.job_seeker_dashboard'))
+        return dashboard_redirect(role)
     
     if request.method == 'POST':
         email = request.form.get('email')
@@ -68,7 +80,7 @@ def register():
                 if not re.match(r'^\d{5}$', zip_code):
                     errors['zip_code'] = 'US ZIP code must be exactly 5 digits.'
         
-        if User.query.filter_by(email=email).first():
+        if db.session.query(User.id).filter_by(email=email).first() is not None:
             errors['email'] = 'Email already registered!'
 
         # Company validation for employers
@@ -148,11 +160,10 @@ def register():
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
-    if current_user.is_authenticated:
+    role = _logged_in_role()
+    if role:
         flash('You are already logged in.', 'info')
-        if current_user.role == 'employer':
-            return redirect(url_for('employer.employer_dashboard'))
-        return redirect(url_for('seeker.job_seeker_dashboard'))
+        return dashboard_redirect(role)
 
     # Display dynamic warning if user was auto-logged out due to 10 minutes of inactivity
     timeout_logout = request.args.get('timeout')
@@ -172,13 +183,12 @@ def login():
             flash('Incorrect password. Please try again!', 'error')
         else:
             login_user(user)
+            session['role'] = user.role
             user.last_login = datetime.utcnow()
             db.session.commit()
+            invalidate_cached_user(user.id)
             
-            if user.role == 'employer':
-                return redirect(url_for('employer.employer_dashboard'))
-            else:
-                return redirect(url_for('seeker.job_seeker_dashboard'))
+            return dashboard_redirect(user.role)
     
     return render_template('login.html')
 
@@ -186,7 +196,9 @@ def login():
 @auth_bp.route('/logout')
 @login_required
 def logout():
+    invalidate_cached_user(current_user.id)
     logout_user()
+    session.pop('role', None)
     
     # Redirect directly to login with timeout warning parameter if logged out via inactivity
     timeout_logout = request.args.get('timeout')
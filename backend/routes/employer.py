@@ -1,10 +1,12 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, send_from_directory, current_app, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime
-from collections import defaultdict
-from models import JobPosting, Application, Resume, Message
+from models import User, JobPosting, Application, Message
 from extensions import db, cache
-from utils import role_required, is_within_service_area, get_user_greeting
+from sqlalchemy import func, case
+from sqlalchemy.orm import joinedload, raiseload
+from utils import role_required, employer_required, is_within_service_area, get_user_greeting, invalidate_active_jobs, \
+    compute_employer_analytics, invalidate_employer_analytics
 
 employer_bp = Blueprint('employer', __name__)
 
@@ -12,26 +14,22 @@ employer_bp = Blueprint('employer', __name__)
 @login_required
 @role_required('employer')
 def employer_dashboard():
-    jobs = JobPosting.query.filter_by(employer_id=current_user.id).order_by(JobPosting.created_at.desc()).all()
-    
-    jobs_with_counts = []
-    for job in jobs:
-        application_count = Application.query.filter_by(job_id=job.id).count()
-        jobs_with_counts.append({
-            'job': job,
-            'application_count': application_count
-        })
-        
-    # Calculate applications submitted in the last 7 days for all employer jobs
     from datetime import timedelta
     one_week_ago = datetime.utcnow() - timedelta(days=7)
-    recent_apps_count = 0
-    for item in jobs_with_counts:
-        recent_count = Application.query.filter(
-            Application.job_id == item['job'].id,
-            Application.submitted_at >= one_week_ago
-        ).count()
-        recent_apps_count += recent_count
+    
+    # Count total and last-7-days applications per job in a single grouped query
+    rows = db.session.query(
+        JobPosting,
+        func.count(Application.id),
+        func.count(case((Application.submitted_at >= one_week_ago, Application.id)))
+    ).options(raiseload('*'))\
+        .outerjoin(Application, Application.job_id == JobPosting.id)\
+        .filter(JobPosting.employer_id == current_user.id)\
+        .group_by(JobPosting.id)\
+        .order_by(JobPosting.created_at.desc()).all()
+    
+    jobs_with_counts = [{'job': job, 'application_count': count} for job, count, _ in rows]
+    recent_apps_count = sum(recent for _, _, recent in rows)
         
     greeting = get_user_greeting(current_user)
     
@@ -104,7 +102,8 @@ def create_job():
         
         db.session.add(job)
         db.session.commit()
-        cache.delete('active_job_postings')
+        invalidate_active_jobs()
+        invalidate_employer_analytics(current_user.id)
         
         flash('Job posted successfully!', 'success')
         return redirect(url_for('employer.employer_dashboard'))
@@ -157,7 +156,8 @@ def edit_job(job_id):
         job.salary_max = s_max
         
         db.session.commit()
-        cache.delete('active_job_postings')
+        invalidate_active_jobs()
+        invalidate_employer_analytics(current_user.id)
         
         flash('Job updated successfully!', 'success')
         return redirect(url_for('employer.employer_dashboard'))
@@ -182,7 +182,8 @@ def toggle_job_status(job_id):
         flash('Job activated successfully!', 'success')
     
     db.session.commit()
-    cache.delete('active_job_postings')
+    invalidate_active_jobs()
+    invalidate_employer_analytics(current_user.id)
     return redirect(url_for('employer.employer_dashboard'))
 
 @employer_bp.route('/employer/jobs/<int:job_id>/archive', methods=['POST'])
@@ -197,7 +198,8 @@ def archive_job(job_id):
     
     job.status = 'archived'
     db.session.commit()
-    cache.delete('active_job_postings')
+    invalidate_active_jobs()
+    invalidate_employer_analytics(current_user.id)
     
     flash('Job archived successfully!', 'success')
     return redirect(url_for('employer.employer_dashboard'))
@@ -214,7 +216,8 @@ def unarchive_job(job_id):
     
     job.status = 'active'
     db.session.commit()
-    cache.delete('active_job_postings')
+    invalidate_active_jobs()
+    invalidate_employer_analytics(current_user.id)
     
     flash('Job unarchived and set to active successfully!', 'success')
     return redirect(url_for('employer.employer_dashboard'))
@@ -237,7 +240,8 @@ def delete_job(job_id):
     db.session.delete(job)
     db.session.commit()
     
-    cache.delete('active_job_postings')
+    invalidate_active_jobs()
+    invalidate_employer_analytics(current_user.id)
     
     flash('Job posting and all associated candidate applications deleted successfully!', 'success')
     return redirect(url_for('employer.employer_dashboard'))
@@ -253,15 +257,15 @@ def view_applications(job_id):
         flash('Access denied!', 'error')
         return redirect(url_for('employer.employer_dashboard'))
     
-    applications = Application.query.filter_by(job_id=job_id).order_by(Application.submitted_at.desc()).all()
+    applications = Application.query.options(
+        joinedload(Application.applicant).selectinload(User.resumes),
+        raiseload('*')
+    ).filter_by(job_id=job_id).order_by(Application.submitted_at.desc()).all()
     
-    applications_with_resumes = []
-    for application in applications:
-        applicant_resumes = Resume.query.filter_by(user_id=application.applicant_id).all()
-        applications_with_resumes.append({
-            'application': application,
-            'all_resumes': applicant_resumes
-        })
+    applications_with_resumes = [{
+        'application': application,
+        'all_resumes': application.applicant.resumes
+    } for application in applications]
     
     return render_template('view_applications.html', job=job, applications_with_resumes=applications_with_resumes)
 
@@ -278,6 +282,7 @@ def update_application_status(application_id):
     new_status = request.form.get('status')
     application.status = new_status
     db.session.commit()
+    invalidate_employer_analytics(current_user.id)
     
     flash('Application status updated!', 'success')
     return redirect(url_for('employer.view_applications', job_id=application.job_id))
@@ -301,6 +306,7 @@ def update_application_status_api(application_id):
         
     application.status = new_status
     db.session.commit()
+    invalidate_employer_analytics(current_user.id)
     
     return jsonify({
         'success': True,
@@ -310,70 +316,17 @@ def update_application_status_api(application_id):
 
 
 @employer_bp.route('/analytics')
-@login_required
-@role_required('employer')
+@employer_required
 def analytics():
-    jobs = JobPosting.query.filter_by(employer_id=current_user.id).all()
-    total_apps_query = Application.query.join(JobPosting).filter(JobPosting.employer_id == current_user.id)
-    total_apps = total_apps_query.all()
-    total_applications = len(total_apps)
-    
-    accepted = len([app for app in total_apps if app.status == 'accepted'])
-    acceptance_rate = (accepted / total_applications * 100) if total_applications else 0
-    
-    interviews = len([app for app in total_apps if app.status == 'interview'])
-    interview_rate = (interviews / total_applications * 100) if total_applications else 0
-    
-    rejected = len([app for app in total_apps if app.status == 'rejected'])
-    rejection_rate = (rejected / total_applications * 100) if total_applications else 0
-    
-    responded = len([app for app in total_apps if app.status != 'applied'])
-    response_rate = (responded / total_applications * 100) if total_applications else 0
-    
-    apps_by_month = defaultdict(int)
-    apps_by_status = defaultdict(int)
-    
-    for app in total_apps:
-        month = app.submitted_at.strftime('%B %Y')
-        apps_by_month[month] += 1
-        apps_by_status[app.status] += 1
-    
-    sorted_months = dict(sorted(apps_by_month.items(), key=lambda x: datetime.strptime(x[0], '%B %Y'), reverse=True)[:6])
-    
-    response_times = []
-    for app in total_apps:
-        if app.status != 'applied':
-            time_diff = (app.updated_at - app.submitted_at).days
-            response_times.append(time_diff)
-    avg_response_time = sum(response_times) / len(response_times) if response_times else 0
-    
-    job_popularity = {}
-    for job in jobs:
-        app_count = Application.query.filter_by(job_id=job.id).count()
-        job_popularity[job.title] = app_count
-    
-    most_popular_job = max(job_popularity.items(), key=lambda x: x[1]) if job_popularity else ("None", 0)
-    active_jobs = len([job for job in jobs if job.status == 'active'])
-    paused_jobs = len([job for job in jobs if job.status == 'paused'])
-    archived_jobs = len([job for job in jobs if job.status == 'archived'])
-    
-    return render_template('analytics.html', 
-                         total_jobs=len(jobs),
-                         total_applications=total_applications,
-                         acceptance_rate=round(acceptance_rate, 1),
-                         interview_rate=round(interview_rate, 1),
-                         rejection_rate=round(rejection_rate, 1),
-                         response_rate=round(response_rate, 1),
-                         apps_by_month=sorted_months,
-                         apps_by_status=dict(apps_by_status),
-                         avg_response_time=round(avg_response_time, 1),
-                         most_popular_job=most_popular_job,
-                         active_jobs=active_jobs,
-                         paused_jobs=paused_jobs,
-                         archived_jobs=archived_jobs)
+    return render_template('analytics.html', **compute_employer_analytics(current_user.id))
+
 
 @employer_bp.route('/uploads/resumes/<filename>')
 @login_required
 @role_required('employer')
 def download_resume(filename):
-    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+    # Stored resume files never change, so browsers may reuse them for an hour, but only privately
+    response = send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, max_age=3600)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
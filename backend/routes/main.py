@@ -1,8 +1,8 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, session, stream_with_context
 from flask_login import login_required, current_user, logout_user
-from models import User, JobPosting
+from models import User, JobPosting, Application
 from extensions import db
-from utils import geocode_address, clean_street_address
+from utils import geocode_address, clean_street_address, invalidate_cached_user, invalidate_active_jobs, invalidate_employer_analytics
 from datetime import datetime
 import os
 
@@ -28,25 +28,27 @@ def index():
 @main_bp.route('/sitemap.xml')
 def sitemap():
     # Dynamic sitemap generation for Google Indexing
-    jobs = JobPosting.query.filter_by(status='active').all()
     # Assume base url is from request
     host = request.url_root.rstrip('/')
     
-    xml = ['<?xml version="1.0" encoding="UTF-8"?>']
-    xml.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
-    
-    # Add static pages
-    static_routes = ['/', '/auth/login', '/auth/register']
-    for route in static_routes:
-        xml.append(f'  <url><loc>{host}{route}</loc></url>')
+    def generate():
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        
+        # Add static pages
+        static_routes = ['/', '/auth/login', '/auth/register']
+        for route in static_routes:
+            yield f'  <url><loc>{host}{route}</loc></url>\n'
         
-    # Add active job pages
-    for job in jobs:
-        xml.append(f'  <url><loc>{host}/seeker/jobs/{job.id}</loc></url>')
+        # Add active job pages. Only the ids are needed, fetched in batches and written out
+        # as they arrive so the response never holds every job in memory
+        job_ids = JobPosting.query.filter_by(status='active').with_entities(JobPosting.id).yield_per(1000)
+        for job_id, in job_ids:
+            yield f'  <url><loc>{host}/seeker/jobs/{job_id}</loc></url>\n'
         
-    xml.append('</urlset>')
+        yield '</urlset>'
     
-    return current_app.response_class('\n'.join(xml), mimetype='application/xml')
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/xml')
 
 @main_bp.route('/robots.txt')
 def robots():
@@ -69,6 +71,9 @@ def profile():
 @main_bp.route('/profile/edit', methods=['GET', 'POST'])
 @login_required
 def edit_profile():
+    # The rate limits below must see the committed timestamps, never a cached copy of the user
+    db.session.refresh(current_user._get_current_object(), ['logo_updated_at', 'address_updated_at'])
+    
     days_until_logo_edit = 0
     if current_user.role == 'employer' and current_user.logo_updated_at:
         delta = datetime.utcnow() - current_user.logo_updated_at
@@ -189,6 +194,7 @@ def edit_profile():
             current_user.skills = request.form.get('skills')
             
         db.session.commit()
+        invalidate_cached_user(current_user.id)
         flash('Profile updated successfully!', 'success')
         return redirect(url_for('main.profile'))
         
@@ -210,13 +216,23 @@ def delete_account():
         return redirect(url_for('main.edit_profile'))
         
     try:
+        user_id = current_user.id
+        # Employers whose analytics count this user's jobs or applications, captured before the cascade deletes them
+        if current_user.role == 'employer':
+            affected_employer_ids = [user_id]
+        else:
+            affected_employer_ids = [employer_id for employer_id, in db.session.query(JobPosting.employer_id)
+                                     .join(Application).filter(Application.applicant_id == user_id).distinct()]
         db.session.delete(current_user)
         db.session.commit()
+        invalidate_cached_user(user_id)
         logout_user()
+        session.pop('role', None)
         
         # Invalidate cache
-        from extensions import cache
-        cache.delete('active_job_postings')
+        invalidate_active_jobs()
+        for employer_id in affected_employer_ids:
+            invalidate_employer_analytics(employer_id)
         
         flash('Your account has been permanently deleted.', 'success')
         return redirect(url_for('main.index'))
@@ -1,23 +1,130 @@
 import os
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_from_directory, current_app
+import uuid
+import hashlib
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_from_directory, current_app, make_response, session
 from flask_login import login_required, current_user
 from datetime import datetime
 from werkzeug.utils import secure_filename
-from models import JobPosting, Application, SavedJob, Resume, FraudReport
+from models import User, JobPosting, Application, SavedJob, Resume, FraudReport
 from extensions import db, cache
 
-from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, raiseload, load_only
+import numpy as np
 
-@cache.cached(timeout=300, key_prefix='active_job_postings')
-def get_cached_active_jobs():
-    return JobPosting.query.options(joinedload(JobPosting.employer)).filter_by(status='active').all()
+@cache.cached(timeout=300, key_prefix='active_job_index')
+def get_active_job_index():
+    """Ids and coordinates of active jobs as NumPy arrays sorted by latitude, so a radius
+    query only scans the latitude band found by binary search"""
+    rows = db.session.query(JobPosting.id, JobPosting.latitude, JobPosting.longitude)\
+        .filter_by(status='active').order_by(JobPosting.latitude).all()
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    lats = np.array([r[1] for r in rows], dtype=np.float64)
+    lngs = np.array([r[2] for r in rows], dtype=np.float64)
+    return ids, lats, lngs
 
 
-from utils import calculate_distance, role_required, get_user_greeting
-from sqlalchemy import func
+from utils import calculate_distance, haversine_km, bounding_box, role_required, get_user_greeting, EARTH_RADIUS_KM, \
+    invalidate_employer_analytics
+from sqlalchemy import func, or_
+import math
 
 seeker_bp = Blueprint('seeker', __name__)
 
+
+def _distance_km_expr(lat, lng):
+    """SQL haversine expression for the distance in km between (lat, lng) and each job posting"""
+    lat_rad = math.radians(lat)
+    job_lat = func.radians(JobPosting.latitude)
+    dlat = job_lat - lat_rad
+    dlng = func.radians(JobPosting.longitude) - math.radians(lng)
+    a = func.power(func.sin(dlat / 2), 2) + math.cos(lat_rad) * func.cos(job_lat) * func.power(func.sin(dlng / 2), 2)
+    # Clamp rounding noise so asin never sees a value above 1
+    return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(a, 1.0)))
+
+
+# Columns the search results, map and geocoded API actually read
+JOB_RESULT_COLUMNS = (
+    JobPosting.id, JobPosting.employer_id, JobPosting.title, JobPosting.description,
+    JobPosting.skills_required, JobPosting.category, JobPosting.employment_type,
+    JobPosting.salary_min, JobPosting.salary_max, JobPosting.city,
+    JobPosting.latitude, JobPosting.longitude
+)
+
+
+def _job_results_query(*entities):
+    """Active jobs with only the result columns and their employer's name and logo loaded"""
+    return db.session.query(JobPosting, *entities).options(
+        load_only(*JOB_RESULT_COLUMNS),
+        joinedload(JobPosting.employer).load_only(User.company_name, User.company_logo)
+    ).filter(JobPosting.status == 'active')
+
+
+def _matches_keyword(job, keyword_lower):
+    return keyword_lower in job.title.lower() or keyword_lower in (job.description or '').lower()
+
+
+def _filter_by_search(query, keyword, category):
+    # Only used on PostgreSQL, whose lower() folds non-ASCII text like Python's str.lower()
+    if keyword:
+        keyword_lower = keyword.lower()
+        query = query.filter(or_(
+            func.lower(JobPosting.title).contains(keyword_lower, autoescape=True),
+            func.lower(JobPosting.description).contains(keyword_lower, autoescape=True)
+        ))
+    if category:
+        query = query.filter(JobPosting.category == category)
+    return query
+
+
+def find_jobs_within_radius(keyword, category, radius):
+    """Return (job, distance) pairs for active jobs within radius km of the current user, nearest first"""
+    user_lat = current_user.latitude
+    user_lng = current_user.longitude
+    if user_lat is None or user_lng is None:
+        return []
+    
+    # A lat/lng bounding box cheaply rejects most jobs before any trig is evaluated
+    min_lat, max_lat, min_lng, max_lng = bounding_box(user_lat, user_lng, radius)
+
+    if db.engine.dialect.name == 'postgresql':
+        # Let PostgreSQL filter and sort by distance so only matching rows cross the wire
+        distance = _distance_km_expr(user_lat, user_lng)
+        query = _job_results_query(distance.label('distance'))\
+            .filter(JobPosting.latitude.between(min_lat, max_lat))
+        if min_lng is not None:
+            query = query.filter(JobPosting.longitude.between(min_lng, max_lng))
+        query = _filter_by_search(query.filter(distance <= radius), keyword, category)
+        return [(job, dist) for job, dist in query.order_by(distance).all()]
+
+    # SQLite has no trig functions, so query the cached spatial index with NumPy instead
+    ids, lats, lngs = get_active_job_index()
+    lo = np.searchsorted(lats, min_lat, side='left')
+    hi = np.searchsorted(lats, max_lat, side='right')
+    candidates = np.arange(lo, hi)
+    if min_lng is not None:
+        band_lngs = lngs[lo:hi]
+        candidates = candidates[(band_lngs >= min_lng) & (band_lngs <= max_lng)]
+    distances = haversine_km(user_lat, user_lng, lats[candidates], lngs[candidates])
+    within = np.flatnonzero(distances <= radius)
+    if not within.size:
+        return []
+    order = within[np.argsort(distances[within], kind='stable')]
+    kept_ids = [int(i) for i in ids[candidates[order]]]
+
+    # Only jobs that survived the distance filter are loaded from the database. SQLite's lower()
+    # only folds ASCII, so the keyword is matched in Python over these few rows instead
+    query = _job_results_query().filter(JobPosting.id.in_(kept_ids))
+    if category:
+        query = query.filter(JobPosting.category == category)
+    jobs = query.all()
+    if keyword:
+        keyword_lower = keyword.lower()
+        jobs = [job for job in jobs if _matches_keyword(job, keyword_lower)]
+    jobs_by_id = {job.id: job for job in jobs}
+    return [(jobs_by_id[job_id], float(distances[i]))
+            for job_id, i in zip(kept_ids, order) if job_id in jobs_by_id]
+
 def allowed_file(filename):
     ALLOWED_EXTENSIONS = {'pdf'}
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -26,8 +133,15 @@ def allowed_file(filename):
 @login_required
 @role_required('job_seeker')
 def job_seeker_dashboard():
-    applications = Application.query.filter_by(applicant_id=current_user.id).order_by(Application.submitted_at.desc()).all()
-    saved_jobs = SavedJob.query.filter_by(user_id=current_user.id).order_by(SavedJob.saved_at.desc()).all()
+    # raiseload('*') turns any relationship the template touches without eager loading into an error
+    applications = Application.query.options(
+        joinedload(Application.job).joinedload(JobPosting.employer),
+        raiseload('*')
+    ).filter_by(applicant_id=current_user.id).order_by(Application.submitted_at.desc()).all()
+    saved_jobs = SavedJob.query.options(
+        joinedload(SavedJob.job).joinedload(JobPosting.employer),
+        raiseload('*')
+    ).filter_by(user_id=current_user.id).order_by(SavedJob.saved_at.desc()).all()
     now = datetime.now()
     
     # Calculate applications submitted in the last 7 days
@@ -64,40 +178,19 @@ def search_jobs():
     category = request.args.get('category', '')
     radius = float(request.args.get('radius', 25))
     
-    # Retrieve active job postings from the high-speed in-memory cache
-    jobs = get_cached_active_jobs()
-    
-    # Filter in-memory to prevent multiple sequential database queries and minimize roundtrips
-    if keyword:
-        keyword_lower = keyword.lower()
-        jobs = [j for j in jobs if keyword_lower in j.title.lower() or keyword_lower in j.description.lower()]
-        
-    if category:
-        jobs = [j for j in jobs if j.category == category]
-        
     jobs_with_distance = []
-    for job in jobs:
-        distance = calculate_distance(
-            current_user.latitude,
-            current_user.longitude,
-            job.latitude,
-            job.longitude
+    for job, distance in find_jobs_within_radius(keyword, category, radius):
+        match_pct, matched_skills, missing_skills = calculate_skills_match(
+            current_user.skills,
+            job.skills_required
         )
-        
-        if distance <= radius:
-            match_pct, matched_skills, missing_skills = calculate_skills_match(
-                current_user.skills,
-                job.skills_required
-            )
-            jobs_with_distance.append({
-                'job': job,
-                'distance': round(distance, 2),
-                'match_percentage': match_pct,
-                'matched_skills': matched_skills,
-                'missing_skills': missing_skills
-            })
-            
-    jobs_with_distance.sort(key=lambda x: x['distance'])
+        jobs_with_distance.append({
+            'job': job,
+            'distance': round(distance, 2),
+            'match_percentage': match_pct,
+            'matched_skills': matched_skills,
+            'missing_skills': missing_skills
+        })
     
     return render_template('search_jobs.html', jobs_with_distance=jobs_with_distance, keyword=keyword, category=category, radius=radius)
 
@@ -109,40 +202,19 @@ def map_jobs():
     category = request.args.get('category', '')
     radius = float(request.args.get('radius', 50))  # Default 50km for map view
     
-    # Retrieve active job postings from the high-speed in-memory cache
-    jobs = get_cached_active_jobs()
-    
-    # Filter in-memory
-    if keyword:
-        keyword_lower = keyword.lower()
-        jobs = [j for j in jobs if keyword_lower in j.title.lower() or keyword_lower in j.description.lower()]
-        
-    if category:
-        jobs = [j for j in jobs if j.category == category]
-        
     jobs_with_distance = []
-    for job in jobs:
-        distance = calculate_distance(
-            current_user.latitude,
-            current_user.longitude,
-            job.latitude,
-            job.longitude
+    for job, distance in find_jobs_within_radius(keyword, category, radius):
+        match_pct, matched_skills, missing_skills = calculate_skills_match(
+            current_user.skills,
+            job.skills_required
         )
-        
-        if distance <= radius:
-            match_pct, matched_skills, missing_skills = calculate_skills_match(
-                current_user.skills,
-                job.skills_required
-            )
-            jobs_with_distance.append({
-                'job': job,
-                'distance': round(distance, 2),
-                'match_percentage': match_pct,
-                'matched_skills': matched_skills,
-                'missing_skills': missing_skills
-            })
-            
-    jobs_with_distance.sort(key=lambda x: x['distance'])
+        jobs_with_distance.append({
+            'job': job,
+            'distance': round(distance, 2),
+            'match_percentage': match_pct,
+            'matched_skills': matched_skills,
+            'missing_skills': missing_skills
+        })
     
     return render_template('map_jobs.html', jobs_with_distance=jobs_with_distance, keyword=keyword, category=category, radius=radius)
 
@@ -151,35 +223,55 @@ def map_jobs():
 def view_job(job_id):
     job = JobPosting.query.get_or_404(job_id)
     
-    distance = None
-    if current_user.role == 'job_seeker':
-        distance = round(calculate_distance(
-            current_user.latitude,
-            current_user.longitude,
-            job.latitude,
-            job.longitude
-        ), 2)
-    
-    already_applied = Application.query.filter_by(
+    # Membership checks select only the id so no Text columns are transferred
+    already_applied = db.session.query(Application.id).filter_by(
         job_id=job_id,
         applicant_id=current_user.id
-    ).first() if current_user.role == 'job_seeker' else None
+    ).first() is not None if current_user.role == 'job_seeker' else False
     
-    is_saved = SavedJob.query.filter_by(
+    is_saved = db.session.query(SavedJob.id).filter_by(
         job_id=job_id,
         user_id=current_user.id
-    ).first() if current_user.role == 'job_seeker' else None
+    ).first() is not None if current_user.role == 'job_seeker' else False
+    
+    # The ETag covers the deployed templates, the job and everything per-user the page shows, so an
+    # unchanged page revalidates with a 304 and skips the distance, skills match and template render
+    page_state = (
+        current_app.config['BUILD_VERSION'],
+        job.id, job.updated_at, job.employer.company_name, job.employer.full_name, job.employer.company_logo,
+        current_user.id, current_user.role, current_user.full_name, current_user.email, current_user.latitude,
+        current_user.longitude, current_user.skills, already_applied, is_saved
+    )
+    etag = hashlib.md5(repr(page_state).encode()).hexdigest()
     
-    match_percentage = None
-    matched_skills = []
-    missing_skills = []
-    if current_user.role == 'job_seeker':
-        match_percentage, matched_skills, missing_skills = calculate_skills_match(
-            current_user.skills,
-            job.skills_required
-        )
+    # Pending flash messages must be rendered, so never answer 304 while any are queued
+    if request.if_none_match.contains(etag) and not session.get('_flashes'):
+        response = current_app.response_class(status=304)
+    else:
+        distance = None
+        if current_user.role == 'job_seeker':
+            distance = round(calculate_distance(
+                current_user.latitude,
+                current_user.longitude,
+                job.latitude,
+                job.longitude
+            ), 2)
         
-    return render_template('view_job.html', job=job, distance=distance, already_applied=already_applied, is_saved=is_saved, match_percentage=match_percentage, matched_skills=matched_skills, missing_skills=missing_skills)
+        match_percentage = None
+        matched_skills = []
+        missing_skills = []
+        if current_user.role == 'job_seeker':
+            match_percentage, matched_skills, missing_skills = calculate_skills_match(
+                current_user.skills,
+                job.skills_required
+            )
+            
+        response = make_response(render_template('view_job.html', job=job, distance=distance, already_applied=already_applied, is_saved=is_saved, match_percentage=match_percentage, matched_skills=matched_skills, missing_skills=missing_skills))
+    
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 @seeker_bp.route('/jobs/<int:job_id>/apply', methods=['GET', 'POST'])
 @login_required
@@ -187,10 +279,10 @@ def view_job(job_id):
 def apply_job(job_id):
     job = JobPosting.query.get_or_404(job_id)
     
-    existing_application = Application.query.filter_by(
+    existing_application = db.session.query(Application.id).filter_by(
         job_id=job_id,
         applicant_id=current_user.id
-    ).first()
+    ).first() is not None
     
     if existing_application:
         flash('You have already applied to this job!', 'warning')
@@ -208,7 +300,14 @@ def apply_job(job_id):
         )
         
         db.session.add(application)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent double-submit got past the check above; the unique index kept one copy
+            db.session.rollback()
+            flash('You have already applied to this job!', 'warning')
+            return redirect(url_for('seeker.view_job', job_id=job_id))
+        invalidate_employer_analytics(job.employer_id)
         
         flash('Application submitted successfully!', 'success')
         return redirect(url_for('seeker.job_seeker_dashboard'))
@@ -237,7 +336,7 @@ def upload_resume():
     
     if file and allowed_file(file.filename):
         original_filename = secure_filename(file.filename)
-        filename = f"{current_user.id}_{datetime.utcnow().timestamp()}_{original_filename}"
+        filename = f"{current_user.id}_{uuid.uuid4().hex}_{original_filename}"
         file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
         
         resume = Resume(
@@ -265,8 +364,10 @@ def delete_resume(resume_id):
         return redirect(url_for('seeker.job_seeker_dashboard'))
     
     file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], resume.filename)
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    try:
+        os.unlink(file_path)
+    except FileNotFoundError:
+        pass
     
     db.session.delete(resume)
     db.session.commit()
@@ -278,15 +379,20 @@ def delete_resume(resume_id):
 @login_required
 @role_required('job_seeker')
 def save_job(job_id):
-    existing = SavedJob.query.filter_by(user_id=current_user.id, job_id=job_id).first()
+    existing = db.session.query(SavedJob.id).filter_by(user_id=current_user.id, job_id=job_id).first() is not None
     
     if existing:
         flash('Job already in your watch list!', 'warning')
     else:
         saved_job = SavedJob(user_id=current_user.id, job_id=job_id)
         db.session.add(saved_job)
-        db.session.commit()
-        flash('Job added to watch list!', 'success')
+        try:
+            db.session.commit()
+            flash('Job added to watch list!', 'success')
+        except IntegrityError:
+            # Lost a race with a concurrent save of the same job
+            db.session.rollback()
+            flash('Job already in your watch list!', 'warning')
     
     return redirect(url_for('seeker.view_job', job_id=job_id))
 
@@ -302,7 +408,7 @@ def report_job(job_id):
         return redirect(url_for('seeker.view_job', job_id=job_id))
         
     # Check if already reported
-    existing = FraudReport.query.filter_by(reporter_id=current_user.id, job_id=job_id).first()
+    existing = db.session.query(FraudReport.id).filter_by(reporter_id=current_user.id, job_id=job_id).first() is not None
     if existing:
         flash('You have already reported this job. Our team is investigating.', 'warning')
         return redirect(url_for('seeker.view_job', job_id=job_id))
@@ -367,49 +473,30 @@ def get_geocoded_jobs():
     category = request.args.get('category', '')
     radius = float(request.args.get('radius', 25))
     
-    jobs = get_cached_active_jobs()
-    
-    if keyword:
-        keyword_lower = keyword.lower()
-        jobs = [j for j in jobs if keyword_lower in j.title.lower() or keyword_lower in j.description.lower()]
-        
-    if category:
-        jobs = [j for j in jobs if j.category == category]
-        
     jobs_data = []
-    for job in jobs:
-        distance = calculate_distance(
-            current_user.latitude,
-            current_user.longitude,
-            job.latitude,
-            job.longitude
+    for job, distance in find_jobs_within_radius(keyword, category, radius):
+        match_pct, matched_skills, missing_skills = calculate_skills_match(
+            current_user.skills,
+            job.skills_required
         )
         
-        if distance <= radius:
-            match_pct, matched_skills, missing_skills = calculate_skills_match(
-                current_user.skills,
-                job.skills_required
-            )
-            
-            jobs_data.append({
-                'id': job.id,
-                'title': job.title,
-                'company_name': job.employer.company_name,
-                'company_logo': job.employer.company_logo or None,
-                'category': job.category,
-                'employment_type': job.employment_type,
-                'salary_min': job.salary_min,
-                'salary_max': job.salary_max,
-                'city': job.city,
-                'latitude': job.latitude,
-                'longitude': job.longitude,
-                'distance': round(distance, 2),
-                'match_percentage': match_pct,
-                'matched_skills': matched_skills,
-                'missing_skills': missing_skills
-            })
-            
-    jobs_data.sort(key=lambda x: x['distance'])
+        jobs_data.append({
+            'id': job.id,
+            'title': job.title,
+            'company_name': job.employer.company_name,
+            'company_logo': job.employer.company_logo or None,
+            'category': job.category,
+            'employment_type': job.employment_type,
+            'salary_min': job.salary_min,
+            'salary_max': job.salary_max,
+            'city': job.city,
+            'latitude': job.latitude,
+            'longitude': job.longitude,
+            'distance': round(distance, 2),
+            'match_percentage': match_pct,
+            'matched_skills': matched_skills,
+            'missing_skills': missing_skills
+        })
     
     return {
         'jobs': jobs_data,
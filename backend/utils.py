@@ -1,11 +1,22 @@
 import os
+import math
+import hashlib
 import requests
 import re
+import numpy as np
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from functools import wraps
 from flask import flash, redirect, url_for
 from flask_login import current_user
 from geopy.distance import geodesic
-from extensions import cache
+from datetime import date
+from sqlalchemy import insert, func, case, extract
+from extensions import db, cache, login_manager
+from models import JobPosting, Application
+
+EARTH_RADIUS_KM = 6371.0
 
 def clean_street_address(street_address, city, state, country):
     """Filter out occurrences of city, state, and country from the street address input to get only the street address"""
@@ -44,9 +55,20 @@ def clean_street_address(street_address, city, state, country):
     cleaned = cleaned.strip().strip(',').strip()
     return cleaned
 
-@cache.memoize(timeout=86400)  # Cache geocoded coordinate pairs for 24 hours
-def geocode_address(address, city, zip_code, country=None):
-    """Convert address to latitude and longitude using Mapbox Geocoding API"""
+MAPBOX_GEOCODE_URL = "https://api.mapbox.com/geocoding/v5/mapbox.places/{q}.json"
+GEOCODE_CACHE_TIMEOUT = 30 * 86400  # Geocoded coordinates are cached for 30 days
+
+# Shared session keeps TLS connections to Mapbox alive between geocoding calls
+_geo_session = requests.Session()
+_geo_session.mount('https://', HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.3)
+))
+
+
+def _build_full_address(address, city, zip_code):
+    """Join the non-empty address parts into the query string sent to Mapbox"""
     address_parts = []
     if address and str(address).strip(): address_parts.append(str(address).strip())
     if city and str(city).strip(): address_parts.append(str(city).strip())
@@ -55,12 +77,11 @@ def geocode_address(address, city, zip_code, country=None):
     if zip_str and zip_str not in ['0', '00000', '000000', 'None']:
         address_parts.append(zip_str)
         
-    full_address = ", ".join(address_parts)
-    api_key = os.getenv('MAPBOX_ACCESS_TOKEN')
-    
-    if not api_key:
-        return None, None
-        
+    return ", ".join(address_parts)
+
+
+def _country_iso_code(country):
+    """Map a free-text country name to the ISO code used to scope Mapbox results"""
     iso_code = 'NG'
     if country:
         c_lower = country.lower().strip()
@@ -72,20 +93,45 @@ def geocode_address(address, city, zip_code, country=None):
             iso_code = 'GB'
         elif 'canada' in c_lower or c_lower == 'ca':
             iso_code = 'CA'
+    return iso_code
+
+
+def _geocode_cache_key(full_address, iso_code):
+    # Key on the normalized address so repeat lookups skip the Mapbox round-trip
+    return "geo:" + hashlib.md5(f"{iso_code}|{full_address.lower()}".encode()).hexdigest()
+
+
+def geocode_address(address, city, zip_code, country=None):
+    """Convert address to latitude and longitude using Mapbox Geocoding API"""
+    full_address = _build_full_address(address, city, zip_code)
+    iso_code = _country_iso_code(country)
+    
+    cache_key = _geocode_cache_key(full_address, iso_code)
+    cached = cache.get(cache_key)
+    if cached:
+        return tuple(cached)
+    
+    api_key = os.getenv('MAPBOX_ACCESS_TOKEN')
+    
+    if not api_key:
+        return None, None
         
-    url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{full_address}.json"
+    url = MAPBOX_GEOCODE_URL.format(q=quote(full_address, safe=''))
     params = {
         'access_token': api_key,
         'limit': 1,
         'country': iso_code
     }
     try:
-        response = requests.get(url, params=params)
+        response = _geo_session.get(url, params=params, timeout=5)
+        response.raise_for_status()
         data = response.json()
         if data.get('features'):
             coordinates = data['features'][0]['geometry']['coordinates']
             longitude = coordinates[0]
             latitude = coordinates[1]
+            # Only successful lookups are cached; failures are retried next time
+            cache.set(cache_key, (latitude, longitude), timeout=GEOCODE_CACHE_TIMEOUT)
             return latitude, longitude
         else:
             return None, None
@@ -94,6 +140,57 @@ def geocode_address(address, city, zip_code, country=None):
         return None, None
 
 
+MAPBOX_BATCH_URL = "https://api.mapbox.com/search/geocode/v6/batch"
+MAPBOX_BATCH_SIZE = 50
+
+
+def geocode_batch(addresses):
+    """Geocode many addresses with the Mapbox batch endpoint, 50 per request.
+    Each entry is an (address, city, zip_code[, country]) tuple; results come back
+    in input order as (latitude, longitude), or (None, None) when lookup fails."""
+    if len(addresses) == 1:
+        return [geocode_address(*addresses[0])]
+    
+    results = [(None, None)] * len(addresses)
+    pending = []  # (input index, full address, iso code, cache key) still needing a lookup
+    for i, entry in enumerate(addresses):
+        address, city, zip_code = entry[:3]
+        country = entry[3] if len(entry) > 3 else None
+        full_address = _build_full_address(address, city, zip_code)
+        iso_code = _country_iso_code(country)
+        cache_key = _geocode_cache_key(full_address, iso_code)
+        cached = cache.get(cache_key)
+        if cached:
+            results[i] = tuple(cached)
+        else:
+            pending.append((i, full_address, iso_code, cache_key))
+    
+    api_key = os.getenv('MAPBOX_ACCESS_TOKEN')
+    if not pending or not api_key:
+        return results
+    
+    for start in range(0, len(pending), MAPBOX_BATCH_SIZE):
+        chunk = pending[start:start + MAPBOX_BATCH_SIZE]
+        queries = [{'q': full_address, 'country': iso_code.lower(), 'limit': 1}
+                   for _, full_address, iso_code, _ in chunk]
+        try:
+            response = _geo_session.post(MAPBOX_BATCH_URL, params={'access_token': api_key}, json=queries, timeout=10)
+            response.raise_for_status()
+            batch = response.json().get('batch', [])
+        except Exception as e:
+            print(f"Batch geocoding error: {e}")
+            continue
+        
+        for (i, _, _, cache_key), collection in zip(chunk, batch):
+            features = collection.get('features') or []
+            if features:
+                longitude, latitude = features[0]['geometry']['coordinates'][:2]
+                results[i] = (latitude, longitude)
+                cache.set(cache_key, (latitude, longitude), timeout=GEOCODE_CACHE_TIMEOUT)
+    
+    return results
+
+
 def calculate_distance(lat1, lon1, lat2, lon2):
     """Calculate distance between two points in kilometers"""
     if None in [lat1, lon1, lat2, lon2]:
@@ -101,19 +198,188 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     return geodesic((lat1, lon1), (lat2, lon2)).km
 
 
-def is_within_service_area(lat, lng):
-    """Check if location is within defined service area.
-    Defaults to nationwide (all of Nigeria) when env vars are not configured."""
+def haversine_km(lat, lng, lats, lngs):
+    """Vectorized great-circle distance in kilometers from one point to arrays of points"""
+    phi1 = np.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlam = np.radians(lngs - lng)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlam / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """Return (min_lat, max_lat, min_lng, max_lng) enclosing every point within radius_km of (lat, lng).
+    The longitude bounds are None when the circle reaches a pole or crosses the antimeridian."""
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angular_radius)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+    dlng = math.degrees(math.asin(math.sin(angular_radius) / math.cos(math.radians(lat))))
+    if lng - dlng < -180 or lng + dlng > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, lng - dlng, lng + dlng
+
+
+def _load_service_area():
     center_lat = os.getenv('SERVICE_AREA_CENTER_LAT')
     center_lng = os.getenv('SERVICE_AREA_CENTER_LNG')
     max_radius = os.getenv('SERVICE_AREA_RADIUS_KM')
+    if not center_lat or not center_lng or not max_radius:
+        return None
+    return float(center_lat), float(center_lng), float(max_radius)
+
 
+# Read once at import; None means no service area is configured
+SERVICE_AREA = _load_service_area()
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+if SERVICE_AREA:
+    SERVICE_AREA_KM_PER_LNG_DEGREE = KM_PER_DEGREE * math.cos(math.radians(SERVICE_AREA[0]))
+    SERVICE_AREA_RADIUS_SQ = SERVICE_AREA[2] ** 2
+
+
+def is_within_service_area(lat, lng):
+    """Check if location is within defined service area.
+    Defaults to nationwide (all of Nigeria) when env vars are not configured.
+    Uses an equirectangular projection around the center, which stays within a couple
+    of percent of the geodesic distance at service-area scales and needs no trig per call."""
     # If no service area is configured, allow the whole country
-    if not center_lat or not center_lng or not max_radius:
+    if SERVICE_AREA is None:
         return True
+    if lat is None or lng is None:
+        return False
+
+    center_lat, center_lng, _ = SERVICE_AREA
+    dx = ((lng - center_lng + 180) % 360 - 180) * SERVICE_AREA_KM_PER_LNG_DEGREE
+    dy = (lat - center_lat) * KM_PER_DEGREE
+    return dx * dx + dy * dy <= SERVICE_AREA_RADIUS_SQ
+
+
+def invalidate_active_jobs():
+    """Drop the cached active job spatial index after any job write"""
+    cache.delete('active_job_index')
+
+
+def _days_between(start, end):
+    """SQL expression for the fractional number of days between two timestamp columns"""
+    if db.engine.dialect.name == 'postgresql':
+        return extract('epoch', end - start) / 86400
+    return func.julianday(end) - func.julianday(start)
+
+
+@cache.memoize(timeout=60)
+def compute_employer_analytics(employer_id):
+    """Aggregate the analytics dashboard figures for one employer.
+    Memoized per employer for a minute; write paths call invalidate_employer_analytics."""
+    # Tally job statuses with conditional aggregates in a single row
+    jobs_agg = db.session.query(
+        func.count(JobPosting.id).label('total'),
+        func.sum(case((JobPosting.status == 'active', 1), else_=0)).label('active'),
+        func.sum(case((JobPosting.status == 'paused', 1), else_=0)).label('paused'),
+        func.sum(case((JobPosting.status == 'archived', 1), else_=0)).label('archived')
+    ).filter(JobPosting.employer_id == employer_id).one()
+    
+    # One row per application status; the same pass sums response times so the average needs no separate query
+    response_days = _days_between(Application.submitted_at, Application.updated_at)
+    status_rows = db.session.query(Application.status, func.count(Application.id),
+                                   func.sum(response_days), func.count(response_days))\
+        .join(JobPosting).filter(JobPosting.employer_id == employer_id)\
+        .group_by(Application.status).all()
+    apps_by_status = {status: count for status, count, _, _ in status_rows}
+    total_jobs = jobs_agg.total
+    total_applications = sum(apps_by_status.values())
+    
+    # Percentages of all applications, rounded once for display
+    outcome_counts = {
+        'acceptance': apps_by_status.get('accepted', 0),
+        'interview': apps_by_status.get('interview', 0),
+        'rejection': apps_by_status.get('rejected', 0),
+        'response': total_applications - apps_by_status.get('applied', 0)
+    }
+    rates = {k: round(v * 100 / total_applications, 1) if total_applications else 0 for k, v in outcome_counts.items()}
+    
+    # Six most recent months with applications, grouped by numeric year/month so labels need no string parsing
+    year = extract('year', Application.submitted_at).label('year')
+    month = extract('month', Application.submitted_at).label('month')
+    month_rows = db.session.query(year, month, func.count(Application.id))\
+        .join(JobPosting).filter(JobPosting.employer_id == employer_id)\
+        .group_by(year, month).order_by(year.desc(), month.desc()).limit(6).all()
+    sorted_months = {date(int(y), int(m), 1).strftime('%B %Y'): count for y, m, count in month_rows}
+    
+    resp_sum = sum(float(days or 0) for status, _, days, _ in status_rows if status != 'applied')
+    resp_n = sum(n for status, _, _, n in status_rows if status != 'applied')
+    avg_response_time = (resp_sum / resp_n) if resp_n else 0
+    
+    # The database ranks jobs by application count and returns only the top one
+    app_count = func.count(Application.id).label('app_count')
+    top_job = db.session.query(JobPosting.title, app_count)\
+        .outerjoin(Application, Application.job_id == JobPosting.id)\
+        .filter(JobPosting.employer_id == employer_id)\
+        .group_by(JobPosting.id, JobPosting.title)\
+        .order_by(app_count.desc(), JobPosting.id).first()
+    
+    most_popular_job = tuple(top_job) if top_job else ("None", 0)
+    # SUM over no rows is NULL, so employers without jobs report zeros
+    active_jobs = jobs_agg.active or 0
+    paused_jobs = jobs_agg.paused or 0
+    archived_jobs = jobs_agg.archived or 0
+    
+    return {
+        'total_jobs': total_jobs,
+        'total_applications': total_applications,
+        'rates': rates,
+        'apps_by_month': sorted_months,
+        'apps_by_status': apps_by_status,
+        'avg_response_time': round(avg_response_time, 1),
+        'most_popular_job': most_popular_job,
+        'active_jobs': active_jobs,
+        'paused_jobs': paused_jobs,
+        'archived_jobs': archived_jobs
+    }
+
+
+def invalidate_employer_analytics(employer_id):
+    """Drop one employer's memoized analytics after a job or application write"""
+    cache.delete_memoized(compute_employer_analytics, employer_id)
+
+
+def bulk_create_jobs(records, return_ids=False):
+    """Insert many job postings with one executemany INSERT and a single commit.
+    records is a list of JobPosting column dicts; the new ids are returned in order when return_ids is set."""
+    if not records:
+        return [] if return_ids else None
+    # render_nulls keeps rows with differing None fields in the same INSERT batch
+    stmt = insert(JobPosting).execution_options(render_nulls=True)
+    ids = None
+    if return_ids:
+        ids = db.session.scalars(stmt.returning(JobPosting.id, sort_by_parameter_order=True), records).all()
+    else:
+        db.session.execute(stmt, records)
+    db.session.commit()
+    invalidate_active_jobs()
+    for employer_id in {record['employer_id'] for record in records}:
+        invalidate_employer_analytics(employer_id)
+    return ids
+
+
+USER_CACHE_TIMEOUT = 60  # Seconds a loaded user row is served from the shared cache
+
+
+def user_cache_key(user_id):
+    return f"user:{user_id}"
 
-    distance = calculate_distance(float(center_lat), float(center_lng), lat, lng)
-    return distance <= float(max_radius)
+
+def invalidate_cached_user(user_id):
+    """Drop the cached user row so the next request reloads it from the database"""
+    cache.delete(user_cache_key(user_id))
+
+
+def dashboard_redirect(role):
+    """Redirect to the dashboard matching the given user role"""
+    if role == 'employer':
+        return redirect(url_for('employer.employer_dashboard'))
+    return redirect(url_for('seeker.job_seeker_dashboard'))
 
 
 def role_required(*roles):
@@ -122,18 +388,20 @@ def role_required(*roles):
         @wraps(fn)
         def decorated_view(*args, **kwargs):
             if not current_user.is_authenticated:
-                return redirect(url_for('auth.login'))
+                return login_manager.unauthorized()
             if current_user.role not in roles:
                 flash('Access denied!', 'error')
                 # redirect to correct dashboard
-                if current_user.role == 'employer':
-                    return redirect(url_for('employer.employer_dashboard'))
-                return redirect(url_for('seeker.job_seeker_dashboard'))
+                return dashboard_redirect(current_user.role)
             return fn(*args, **kwargs)
         return decorated_view
     return wrapper
 
 
+# Stands in for @login_required + @role_required('employer'); rejected users are turned away before the view runs
+employer_required = role_required('employer')
+
+
 def get_user_greeting(user):
     """Calculate personalized timezone-aware greetings natively based on country offset.
     Nigeria: WAT (UTC+1)
@@ -6,8 +6,9 @@ base_dir = os.path.abspath(os.path.dirname(__file__))
 sys.path.insert(0, base_dir)
 sys.path.insert(0, os.path.join(base_dir, 'backend'))
 
-from backend.app import app
+from backend.app import app, init_db
 
 if __name__ == '__main__':
     print("Starting Local Job Connect...")
+    init_db(app)
     app.run(debug=True)
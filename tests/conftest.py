@@ -0,0 +1,95 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+# Point the app at a throwaway in-memory database before it is imported
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ.pop('REDIS_URL', None)
+
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(base_dir, 'backend'))
+
+from flask import g
+from sqlalchemy import event
+
+from app import create_app, init_db
+from extensions import db, cache
+from models import User, JobPosting, Application, Resume, SavedJob
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    init_db(app, raise_errors=True)
+    with app.app_context():
+        cache.clear()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting every SQL statement executed inside it"""
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return counter
+
+
+def login(client, user):
+    # Requests reuse the fixture's app context, so drop any user Flask-Login cached on g
+    g.pop('_login_user', None)
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+        sess['role'] = user.role
+
+
+@pytest.fixture
+def seed(app):
+    """Create an employer and a job seeker linked through num_jobs jobs, applications and saved jobs"""
+    def seed(num_jobs):
+        employer = User(email='employer@example.com', role='employer', full_name='Employer',
+                        company_name='Acme', latitude=6.5244, longitude=3.3792)
+        seeker = User(email='seeker@example.com', role='job_seeker', full_name='Seeker',
+                      latitude=6.5244, longitude=3.3792, skills='python')
+        for user in (employer, seeker):
+            user.set_password('password')
+        db.session.add_all([employer, seeker])
+        db.session.flush()
+
+        db.session.add_all([Resume(user_id=seeker.id, filename=f'r{i}.pdf', original_filename=f'r{i}.pdf')
+                            for i in range(2)])
+        jobs = [JobPosting(employer_id=employer.id, title=f'Job {i}', description='Work', category='Tech',
+                           street_address='1 Main St', city='Lagos', zip_code=100001,
+                           latitude=6.5244, longitude=3.3792) for i in range(num_jobs)]
+        db.session.add_all(jobs)
+        db.session.flush()
+        for job in jobs:
+            db.session.add(Application(job_id=job.id, applicant_id=seeker.id))
+            db.session.add(SavedJob(user_id=seeker.id, job_id=job.id))
+        db.session.commit()
+        # Reload the rows, then detach them so the views query the database instead of the identity map
+        for obj in (employer, seeker, *jobs):
+            db.session.refresh(obj)
+        db.session.expunge_all()
+        return employer, seeker, jobs
+    return seed
@@ -0,0 +1,33 @@
+import pytest
+
+from conftest import login
+
+# Query budgets per view, including the Flask-Login user load; they must not grow with the row count
+@pytest.mark.parametrize('num_jobs', [1, 5])
+def test_employer_dashboard_query_count(client, seed, count_queries, num_jobs):
+    employer, _, _ = seed(num_jobs)
+    login(client, employer)
+    with count_queries() as statements:
+        response = client.get('/employer/dashboard')
+    assert response.status_code == 200
+    assert len(statements) <= 2
+
+
+@pytest.mark.parametrize('num_jobs', [1, 5])
+def test_job_seeker_dashboard_query_count(client, seed, count_queries, num_jobs):
+    _, seeker, _ = seed(num_jobs)
+    login(client, seeker)
+    with count_queries() as statements:
+        response = client.get('/job-seeker/dashboard')
+    assert response.status_code == 200
+    assert len(statements) <= 5
+
+
+@pytest.mark.parametrize('num_jobs', [1, 5])
+def test_view_applications_query_count(client, seed, count_queries, num_jobs):
+    employer, _, jobs = seed(num_jobs)
+    login(client, employer)
+    with count_queries() as statements:
+        response = client.get(f'/employer/jobs/{jobs[0].id}/applications')
+    assert response.status_code == 200
+    assert len(statements) <= 4